@@ -1,36 +1,132 @@
 import pandas as pd
-
-# do for 10 shows
-from tqdm import tqdm
-import time
-import difflib
-import json
-from openai import OpenAI
+import numpy as np
+import orjson
+from openai import OpenAI, DefaultHttpxClient
+import httpx
 import os
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
-import ast
 import tiktoken
-import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from collections import defaultdict
 import asyncio
+import functools
+import chromadb
+
+# Initialize OpenAI client with one keep-alive HTTP/2 connection pool shared by
+# the chat and embeddings calls
+http_client = DefaultHttpxClient(
+    http2=True,
+    limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+)
+client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=http_client)
+
+PODS_CSV_PATH = "0_pods.csv"
+PODS_STATS_CSV_PATH = "pods_stats.csv"
+PODS_VECTOR_DB_PATH = "./1_pods_with_stats_embeddings"
+# Default collection name used when the DB was built with LangChain's Chroma
+PODS_VECTOR_DB_COLLECTION = "langchain"
+# The ingest notebook (5_p_embeddings.ipynb) chooses the embedding model and
+# size and records them in the collection metadata; queries read them from
+# there. Collections ingested before that was recorded used this model
+LEGACY_PODS_EMBEDDING_MODEL = "text-embedding-ada-002"
+
+# Columns kept from 0_pods.csv, mapped to the keys used in podcast details
+POD_DETAILS_COLUMNS = {
+    'name': 'name',
+    'image': 'image',
+    'summary': 'summary',
+    'categories': 'categories',
+    'youtubeID': 'youtube_id',
+    'spotifyId': 'spotify_id',
+    'websiteName': 'website_name',
+    'rssFeed': 'rss_feed'
+}
 
+POD_STATS_COLUMNS = [
+    'min_impressions',
+    'max_impressions',
+    'youtube_subscribers',
+    'instagram_followers',
+    'episode_avg_views',
+    'estimated_ad_price'
+]
+
+DEFAULT_POD_STATS = {
+    'min_impressions': 0,
+    'max_impressions': 0,
+    'youtube_subscribers': 0,
+    'instagram_followers': 0,
+    'episode_avg_views': 0,
+    'estimated_ad_price': 'N/A'
+}
 
-from langchain.text_splitter import CharacterTextSplitter
-from langchain.document_loaders import TextLoader
-from langchain.docstore.document import Document
+def default_podcast_details(client_id):
+    return {
+        'name': f'Podcast {client_id}',
+        'image': '',
+        'summary': 'No details available',
+        'categories': '',
+        'youtube_id': '',
+        'spotify_id': '',
+        'website_name': '',
+        'rss_feed': ''
+    }
+
+@functools.lru_cache(maxsize=1)
+def load_podcast_details_df():
+    """
+    Load 0_pods.csv once as a DataFrame of podcast details indexed by id
+    
+    Returns:
+        pd.DataFrame: Podcast details, one row per id
+    """
+    pods_df = pd.read_csv(PODS_CSV_PATH)
+    # Keep the first row per id, matching the previous row-scan lookup
+    pods_df = pods_df.drop_duplicates(subset='id').set_index('id')
+    return pods_df[list(POD_DETAILS_COLUMNS)].rename(columns=POD_DETAILS_COLUMNS)
 
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import TextLoader
+@functools.lru_cache(maxsize=1)
+def load_podcast_stats_df():
+    """
+    Load pods_stats.csv once as a DataFrame of advertising stats indexed by clientId
+    
+    Returns:
+        pd.DataFrame: Advertising stats, one row per clientId
+    """
+    stats_df = pd.read_csv(PODS_STATS_CSV_PATH)
+    stats_df = stats_df.drop_duplicates(subset='clientId').set_index('clientId')
+    return stats_df[POD_STATS_COLUMNS]
 
-from langchain.embeddings import OpenAIEmbeddings
-from langchain.vectorstores import Chroma
+def get_podcast_details_batch(pod_ids):
+    """
+    Get podcast details for several pod_ids with one indexed lookup
+    
+    Args:
+        pod_ids (list): The clientIds/pod_ids to lookup, in result order
+        
+    Returns:
+        list: Podcast details dictionaries aligned with pod_ids
+    """
+    pods_df = load_podcast_details_df()
+    found_ids = pd.Index(pod_ids).isin(pods_df.index)
+    details_records = pods_df.reindex(pod_ids).fillna('').to_dict(orient='records')
+    return [
+        podcast_details if found else default_podcast_details(pod_id)
+        for pod_id, found, podcast_details in zip(pod_ids, found_ids, details_records)
+    ]
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+def get_podcast_stats_batch(pod_ids):
+    """
+    Get podcast advertising stats for several pod_ids with one indexed lookup
+    
+    Args:
+        pod_ids (list): The clientIds to lookup, in result order
+        
+    Returns:
+        list: Advertising stats dictionaries aligned with pod_ids
+    """
+    return load_podcast_stats_df().reindex(pod_ids).fillna(DEFAULT_POD_STATS).to_dict(orient='records')
 
 def get_podcast_details(client_id):
     """
@@ -42,48 +138,7 @@ def get_podcast_details(client_id):
     Returns:
         dict: Dictionary containing podcast name, image, and other details
     """
-    try:
-        # Load the CSV file
-        pods_df = pd.read_csv("0_pods.csv")
-        
-        # Find the podcast by clientId (id column)
-        podcast_row = pods_df[pods_df['id'] == client_id]
-        
-        if not podcast_row.empty:
-            row = podcast_row.iloc[0]
-            return {
-                'name': row.get('name', 'Unknown Podcast'),
-                'image': row.get('image', ''),
-                'summary': row.get('summary', ''),
-                'categories': row.get('categories', ''),
-                'youtube_id': row.get('youtubeID', ''),
-                'spotify_id': row.get('spotifyId', ''),
-                'website_name': row.get('websiteName', ''),
-                'rss_feed': row.get('rssFeed', '')
-            }
-        else:
-            return {
-                'name': f'Podcast {client_id}',
-                'image': '',
-                'summary': 'No details available',
-                'categories': '',
-                'youtube_id': '',
-                'spotify_id': '',
-                'website_name': '',
-                'rss_feed': ''
-            }
-    except Exception as e:
-        print(f"Error loading podcast details for {client_id}: {e}")
-        return {
-            'name': f'Podcast {client_id}',
-            'image': '',
-            'summary': 'Error loading details',
-            'categories': '',
-            'youtube_id': '',
-            'spotify_id': '',
-            'website_name': '',
-            'rss_feed': ''
-        }
+    return get_podcast_details_batch([client_id])[0]
 
 def get_podcast_stats(client_id):
     """
@@ -95,50 +150,165 @@ def get_podcast_stats(client_id):
     Returns:
         dict: Dictionary containing advertising metrics
     """
-    try:
-        # Load the stats CSV file
-        stats_df = pd.read_csv("pods_stats.csv")
-        
-        # Find the podcast stats by clientId
-        stats_row = stats_df[stats_df['clientId'] == client_id]
-        
-        if not stats_row.empty:
-            row = stats_row.iloc[0]
-            return {
-                'min_impressions': row.get('min_impressions', 0),
-                'max_impressions': row.get('max_impressions', 0),
-                'youtube_subscribers': row.get('youtube_subscribers', 0),
-                'instagram_followers': row.get('instagram_followers', 0),
-                'episode_avg_views': row.get('episode_avg_views', 0),
-                'estimated_ad_price': row.get('estimated_ad_price', 'N/A')
-            }
-        else:
-            return {
-                'min_impressions': 0,
-                'max_impressions': 0,
-                'youtube_subscribers': 0,
-                'instagram_followers': 0,
-                'episode_avg_views': 0,
-                'estimated_ad_price': 'N/A'
-            }
-    except Exception as e:
-        print(f"Error loading podcast stats for {client_id}: {e}")
-        return {
-            'min_impressions': 0,
-            'max_impressions': 0,
-            'youtube_subscribers': 0,
-            'instagram_followers': 0,
-            'episode_avg_views': 0,
-            'estimated_ad_price': 'N/A'
-        }
+    return get_podcast_stats_batch([client_id])[0]
 
+@functools.lru_cache(maxsize=1)
 def load_podcasts_vector_db():
-    embedding = OpenAIEmbeddings()
-    pods_stats_db = Chroma(persist_directory="./1_pods_with_stats_embeddings", embedding_function=embedding)
+    """
+    Open the persisted Chroma collection of podcast embeddings
+    
+    The handle is cached so the HNSW index and metadata are loaded from disk
+    once per process instead of on every search.
+    
+    Returns:
+        chromadb.Collection: Collection of podcast profile embeddings
+    """
+    chroma_client = chromadb.PersistentClient(path=PODS_VECTOR_DB_PATH)
+    pods_stats_db = chroma_client.get_collection(PODS_VECTOR_DB_COLLECTION)
     return pods_stats_db
 
-def get_required_podcast_details_for_brand(brand_details):
-    prompt = f"""
+def create_embeddings(texts, model, dimensions=None):
+    """
+    Embed texts with the OpenAI embeddings API in a single request
+    
+    Args:
+        texts (str or list): Text or texts to embed
+        model (str): Embedding model name
+        dimensions (int, optional): Output size for models that support it
+        
+    Returns:
+        list: Embedding vectors in input order
+    """
+    options = {'dimensions': dimensions} if dimensions else {}
+    response = client.embeddings.create(model=model, input=texts, **options)
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+@functools.lru_cache(maxsize=128)
+def embed_podcast_profile(podcast_details_string, model, dimensions=None):
+    """
+    Embed an ideal podcast profile string for vector search
+    
+    Cached on the profile string, so repeat submissions that produce the same
+    profile skip the embeddings API call.
+    
+    Args:
+        podcast_details_string (str): Profile generated for a brand
+        model (str): Embedding model the podcast collection was built with
+        dimensions (int, optional): Embedding size of the podcast collection
+        
+    Returns:
+        tuple: The profile embedding vector
+    """
+    return tuple(create_embeddings(podcast_details_string, model, dimensions)[0])
+
+def quantize_embeddings(embeddings):
+    """
+    Symmetrically quantize embedding rows to int8 with one scale per row
+    
+    Args:
+        embeddings (np.ndarray): 2D float array, one embedding per row
+        
+    Returns:
+        tuple: (int8 matrix, float32 per-row scales) with
+            embeddings ~= int8 matrix * scales[:, None]
+    """
+    scales = np.abs(embeddings).max(axis=1) / 127
+    scales[scales == 0] = 1
+    quantized = np.round(embeddings / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+# Rows of the int8 matrix dequantized per step of a search; small enough that
+# the float32 copy stays in cache instead of materializing the whole matrix
+EMBEDDING_SCORE_CHUNK_ROWS = 128
+
+@functools.lru_cache(maxsize=1)
+def load_podcast_embedding_index():
+    """
+    Load every podcast embedding from the Chroma collection into memory
+    
+    Embeddings are L2-normalized once here, so similarity at query time is a
+    single matrix-vector product instead of a Chroma HNSW query. The matrix is
+    held as int8 with per-row scales, a quarter of the float32 footprint.
+    
+    Returns:
+        dict: ids, documents, metadatas, the quantized normalized embedding
+            matrix with its row scales, each podcast's estimated_ad_price_int
+            (NaN where not ingested), and the embedding model and dimensions
+            queries must use
+    """
+    pods_stats_db = load_podcasts_vector_db()
+    collection_metadata = pods_stats_db.metadata or {}
+    records = pods_stats_db.get(include=["embeddings", "documents", "metadatas"])
+    embeddings = np.asarray(records['embeddings'], dtype=np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    quantized_embeddings, embedding_scales = quantize_embeddings(embeddings)
+    estimated_ad_prices = np.array(
+        [(metadata or {}).get('estimated_ad_price_int', np.nan) for metadata in records['metadatas']],
+        dtype=np.float64
+    )
+    return {
+        'ids': records['ids'],
+        'documents': records['documents'],
+        'metadatas': records['metadatas'],
+        'embeddings': quantized_embeddings,
+        'embedding_scales': embedding_scales,
+        'estimated_ad_prices': estimated_ad_prices,
+        'embedding_model': collection_metadata.get('embedding_model', LEGACY_PODS_EMBEDDING_MODEL),
+        'embedding_dimensions': collection_metadata.get('embedding_dimensions')
+    }
+
+def search_podcast_embeddings(podcast_index, query_embedding, k=5, max_ad_price=None):
+    """
+    Find the k podcasts closest to a query embedding
+    
+    Args:
+        podcast_index (dict): Index from load_podcast_embedding_index
+        query_embedding (sequence): Embedding of the ideal podcast profile
+        k (int): Number of matches to return
+        max_ad_price (int, optional): Drop podcasts whose estimated ad price is
+            above this. Podcasts without a price in their metadata are kept.
+        
+    Returns:
+        dict: Chroma-style query result with ids, documents, metadatas and
+            distances for the single query
+    """
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query /= np.linalg.norm(query)
+    
+    # Score chunk by chunk in float32 (NumPy has no integer BLAS), then apply
+    # the row scales to get back to cosine similarity
+    quantized_embeddings = podcast_index['embeddings']
+    scores = np.empty(len(quantized_embeddings), dtype=np.float32)
+    for start in range(0, len(quantized_embeddings), EMBEDDING_SCORE_CHUNK_ROWS):
+        end = start + EMBEDDING_SCORE_CHUNK_ROWS
+        np.matmul(quantized_embeddings[start:end].astype(np.float32), query, out=scores[start:end])
+    scores *= podcast_index['embedding_scales']
+    
+    if max_ad_price is not None:
+        scores[podcast_index['estimated_ad_prices'] > max_ad_price] = -np.inf
+    
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k] if k else np.array([], dtype=int)
+    top = top[np.argsort(-scores[top])]
+    top = top[np.isfinite(scores[top])]
+    
+    # Squared L2 distance between unit vectors, matching Chroma's "l2" space
+    distances = 2 - 2 * scores[top]
+    return {
+        'ids': [[podcast_index['ids'][i] for i in top]],
+        'documents': [[podcast_index['documents'][i] for i in top]],
+        'metadatas': [[podcast_index['metadatas'][i] for i in top]],
+        'distances': [distances.tolist()]
+    }
+
+PODCAST_PROFILE_MODEL = "gpt-4o-mini"
+
+PODCAST_PROFILE_SYSTEM_PROMPT = (
+    'You respond with a single JSON object of the form '
+    '{"podcast_details_string": "<ideal podcast profile as one JSON-safe string>"}.'
+)
+
+PODCAST_PROFILE_PROMPT_PREFIX = """
 You are an expert assistant helping brands find the most suitable podcasts to advertise on.
 
 ---
@@ -190,7 +360,7 @@ This profile will be used to semantically match against real podcasts in a vecto
 
 🧾 Output Format (strictly follow this format):
 
-{{
+{
   "podcast_details_string": "<natural language summary of ideal podcast – audience, tone, topics>
 Main Category: <one from the list above>
 Subcategories: <comma-separated values from the list above>
@@ -207,28 +377,72 @@ Ad Percentage Per Episode: <percentage>%
 Average Ads Per Episode: <float>
 Brand Repeat Rate: <percentage>%
 Top Past Sponsors: [<brand1>, <brand2>, ...]"
-}}
+}
 
 ---
 
 🔍 Brand Details:
-{brand_details}
 """
 
-    response = client.responses.create(
-        model= "gpt-4o",
-        input=prompt,
+@functools.lru_cache(maxsize=1)
+def get_prompt_encoder():
+    """
+    Get the tokenizer for the podcast profile model, built once per process
+    
+    Returns:
+        tiktoken.Encoding: Tokenizer used to measure prompt size
+    """
+    return tiktoken.encoding_for_model(PODCAST_PROFILE_MODEL)
+
+@functools.lru_cache(maxsize=1)
+def get_prompt_prefix_token_count():
+    """
+    Count the tokens of the static podcast profile prompt prefix, once per process
+    
+    Returns:
+        int: Token count of PODCAST_PROFILE_PROMPT_PREFIX
+    """
+    return len(get_prompt_encoder().encode(PODCAST_PROFILE_PROMPT_PREFIX))
+
+def count_prompt_tokens(brand_details_string):
+    """
+    Count the tokens of the podcast profile prompt for a brand
+    
+    Only the brand details are tokenized per call; the static prefix count is
+    computed once. The sum can differ from tokenizing the full prompt by a
+    token at the join.
+    
+    Args:
+        brand_details_string (str): Serialized brand details appended to the prompt
+        
+    Returns:
+        int: Approximate prompt token count
+    """
+    return get_prompt_prefix_token_count() + len(get_prompt_encoder().encode(brand_details_string))
+
+def get_required_podcast_details_for_brand(brand_details):
+    brand_details_string = orjson.dumps(brand_details).decode()
+    prompt = PODCAST_PROFILE_PROMPT_PREFIX + brand_details_string
+    try:
+        print(f"Podcast profile prompt tokens: {count_prompt_tokens(brand_details_string)}")
+    except Exception as e:
+        # Token logging is diagnostic only, e.g. the tokenizer file may not be downloadable
+        print("Could not count prompt tokens: ", e)
+
+    response = client.chat.completions.create(
+        model=PODCAST_PROFILE_MODEL,
+        messages=[
+            {"role": "system", "content": PODCAST_PROFILE_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        response_format={"type": "json_object"},
         temperature=0
     )
 
-    raw_output =  response.output_text.strip()
-    # Remove code fences like ```json and ```
-    if raw_output.startswith("```"):
-        raw_output = raw_output.strip("`")
-        raw_output = raw_output.replace("json\n", "").replace("json", "")
+    raw_output = response.choices[0].message.content.strip()
 
     try:
-        podcast_matching_string = json.loads(raw_output)
+        podcast_matching_string = orjson.loads(raw_output)
         podcast_details_string = podcast_matching_string["podcast_details_string"]
     except Exception as e:
         print("Exception: ", e)
@@ -236,31 +450,65 @@ Top Past Sponsors: [<brand1>, <brand2>, ...]"
 
     return podcast_details_string
 
-def get_enhanced_podcast_results(vector_results):
+@functools.lru_cache(maxsize=1024)
+def format_number(num):
+    """
+    Format a count for display, e.g. 1500 -> "1.5K", 2300000 -> "2.3M"
+    
+    Args:
+        num (float): Count to format
+        
+    Returns:
+        str: Abbreviated count
+    """
+    if num >= 1000000:
+        return f"{num/1000000:.1f}M"
+    elif num >= 1000:
+        return f"{num/1000:.1f}K"
+    else:
+        return str(int(num))
+
+async def get_enhanced_podcast_results(query_results):
     """
     Enhance vector search results with podcast details and stats
     
+    Details and stats lookups run concurrently off the event loop. Display
+    values (similarity percent, short summary, formatted counts) are computed
+    here so rendering a result only reads strings.
+    
     Args:
-        vector_results (list): List of (document, score) tuples from vector search
+        query_results (dict): Chroma query result with documents, metadatas and distances
         
     Returns:
         list: List of enhanced podcast dictionaries
     """
     enhanced_results = []
     
-    for doc, score in vector_results:
-        # Extract pod_id from metadata (assuming it exists)
-        pod_id = doc.metadata.get('pod_id', doc.metadata.get('clientId', doc.metadata.get('id', 'unknown')))
-        
-        # Get podcast details and stats
-        podcast_details = get_podcast_details(pod_id)
-        podcast_stats = get_podcast_stats(pod_id)
-        
+    documents = query_results['documents'][0]
+    # chromadb returns None for entries stored without metadata
+    metadatas = [metadata or {} for metadata in query_results['metadatas'][0]]
+    distances = query_results['distances'][0]
+    
+    # Extract pod_id from metadata (assuming it exists)
+    pod_ids = [
+        metadata.get('pod_id', metadata.get('clientId', metadata.get('id', 'unknown')))
+        for metadata in metadatas
+    ]
+    
+    # Get podcast details and stats for all results
+    details_records, stats_records = await asyncio.gather(
+        asyncio.to_thread(get_podcast_details_batch, pod_ids),
+        asyncio.to_thread(get_podcast_stats_batch, pod_ids)
+    )
+    
+    for document, metadata, score, pod_id, podcast_details, podcast_stats in zip(
+        documents, metadatas, distances, pod_ids, details_records, stats_records
+    ):
         enhanced_result = {
             'pod_id': pod_id,
             'similarity_score': score,
-            'content': doc.page_content,
-            'metadata': doc.metadata,
+            'content': document,
+            'metadata': metadata,
             'name': podcast_details['name'],
             'image': podcast_details['image'],
             'summary': podcast_details['summary'],
@@ -277,14 +525,28 @@ def get_enhanced_podcast_results(vector_results):
             'estimated_ad_price': podcast_stats['estimated_ad_price']
         }
         
+        summary = podcast_details['summary']
+        # Clamped: distances above 1 (weak matches) would give a negative percent
+        enhanced_result['similarity_percent'] = min(max((1 - score) * 100, 0.0), 100.0)
+        enhanced_result['summary_short'] = summary[:200] + "..." if len(summary) > 200 else summary
+        enhanced_result['youtube_subscribers_display'] = format_number(podcast_stats['youtube_subscribers'])
+        enhanced_result['instagram_followers_display'] = format_number(podcast_stats['instagram_followers'])
+        enhanced_result['episode_avg_views_display'] = format_number(podcast_stats['episode_avg_views'])
+        enhanced_result['impressions_range_display'] = (
+            f"{format_number(podcast_stats['min_impressions'])}-{format_number(podcast_stats['max_impressions'])}"
+        )
+        
         enhanced_results.append(enhanced_result)
     
     return enhanced_results
 
-def search_for_podcasts(brand_details):
+async def search_for_podcasts(brand_details, index_loader=load_podcast_embedding_index):
     """
     Search for podcasts based on brand details and return enhanced results
     
+    The ideal podcast profile is generated while the embedding index is loaded, so
+    the search waits for the slower of the two rather than both in turn.
+    
     Args:
         brand_details (dict): Dictionary containing brand information including:
             - website: str
@@ -294,19 +556,31 @@ def search_for_podcasts(brand_details):
             - target_gender: str
             - target_hhi: str
             - interests: list
+        index_loader (callable, optional): Returns the podcast embedding
+            index, e.g. a loader cached by the caller. Run alongside the
+            profile generation so a cold load still overlaps with it.
     
     Returns:
         list: List of enhanced podcast dictionaries with names, images, and stats
     """
-    llm_result_string_for_brand = get_required_podcast_details_for_brand(brand_details)
-    pods_stats_db = load_podcasts_vector_db()
-    vector_results = pods_stats_db.similarity_search_with_score(
+    llm_result_string_for_brand, podcast_index = await asyncio.gather(
+        asyncio.to_thread(get_required_podcast_details_for_brand, brand_details),
+        asyncio.to_thread(index_loader)
+    )
+    query_embedding = embed_podcast_profile(
         llm_result_string_for_brand,
-        k=5  # or however many top matches you want
+        model=podcast_index['embedding_model'],
+        dimensions=podcast_index['embedding_dimensions']
+    )
+    query_results = search_podcast_embeddings(
+        podcast_index,
+        query_embedding,
+        k=5,  # or however many top matches you want
+        max_ad_price=brand_details.get('budget')
     )
     
     # Enhance results with podcast details and stats
-    enhanced_results = get_enhanced_podcast_results(vector_results)
+    enhanced_results = await get_enhanced_podcast_results(query_results)
     
     print(f"Found {len(enhanced_results)} enhanced podcast recommendations")
     return enhanced_results
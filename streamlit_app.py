@@ -1,6 +1,8 @@
 import streamlit as st
 import pandas as pd
 import os
+import asyncio
+import json
 from dotenv import load_dotenv
 from app import search_for_podcasts, get_required_podcast_details_for_brand
 
@@ -93,6 +95,97 @@ with st.form("brand_details_form"):
     
     submitted = st.form_submit_button("🔍 Find Recommended Podcasts", type="primary")
 
+# Render one recommended podcast card
+def render_podcast_card(i, podcast):
+    # Create a container for each podcast recommendation
+    with st.container():
+        st.markdown(f"### #{i} - {podcast['name']}")
+        
+        # Create columns for image and details
+        col1, col2, col3 = st.columns([1, 2, 2])
+        
+        with col1:
+            # Display podcast image
+            if podcast['image'] and podcast['image'].strip():
+                try:
+                    st.image(podcast['image'], width=150, caption=podcast['name'])
+                except:
+                    st.markdown("🎙️ *No image available*")
+            else:
+                st.markdown("🎙️ *No image available*")
+        
+        with col2:
+            # Basic podcast info
+            st.markdown("**📊 Match Quality**")
+            st.progress(podcast['similarity_percent'] / 100)
+            st.write(f"Similarity Score: {podcast['similarity_percent']:.1f}%")
+            
+            st.markdown("**📝 Description**")
+            if podcast['summary']:
+                st.write(podcast['summary_short'])
+            else:
+                st.write("No description available")
+            
+            # Categories
+            if podcast['categories']:
+                st.markdown("**🏷️ Categories**")
+                try:
+                    # Parse categories if it's a JSON string
+                    if isinstance(podcast['categories'], str) and podcast['categories'].startswith('['):
+                        categories = json.loads(podcast['categories'])
+                        st.write(", ".join(categories))
+                    else:
+                        st.write(podcast['categories'])
+                except:
+                    st.write(podcast['categories'])
+        
+        with col3:
+            # Advertising metrics
+            st.markdown("**💰 Advertising Metrics**")
+            
+            if podcast['youtube_subscribers'] > 0:
+                st.metric("YouTube Subscribers", podcast['youtube_subscribers_display'])
+            
+            if podcast['instagram_followers'] > 0:
+                st.metric("Instagram Followers", podcast['instagram_followers_display'])
+            
+            if podcast['episode_avg_views'] > 0:
+                st.metric("Avg Episode Views", podcast['episode_avg_views_display'])
+            
+            # Impressions range
+            if podcast['min_impressions'] > 0 and podcast['max_impressions'] > 0:
+                st.metric("Impressions Range", podcast['impressions_range_display'])
+            
+            # Ad pricing
+            if podcast['estimated_ad_price'] != 'N/A':
+                st.markdown("**💵 Estimated Ad Prices**")
+                st.write(f"📺 {podcast['estimated_ad_price']}")
+        
+        # Expandable section for more details
+        with st.expander("📋 View Detailed Analysis & Raw Data"):
+            st.markdown("**🔍 AI Analysis Content:**")
+            st.text_area("Vector Search Match Content", 
+                       podcast['content'], 
+                       height=100, 
+                       key=f"content_{i}")
+            
+            # Platform links
+            col_yt, col_spotify = st.columns(2)
+            with col_yt:
+                if podcast['youtube_id']:
+                    st.markdown(f"🎥 [YouTube Channel](https://youtube.com/channel/{podcast['youtube_id']})")
+            
+            with col_spotify:
+                if podcast['spotify_id']:
+                    st.markdown(f"🎵 [Spotify Podcast](https://open.spotify.com/show/{podcast['spotify_id']})")
+            
+            # Raw metadata
+            if podcast['metadata']:
+                st.markdown("**🔧 Technical Metadata:**")
+                st.json(podcast['metadata'])
+        
+        st.markdown("---")
+
 # Process form submission
 if submitted:
     # Validate inputs
@@ -122,7 +215,7 @@ if submitted:
         with st.spinner("🤖 Analyzing your brand and finding the best podcast matches..."):
             try:
                 # Get podcast recommendations
-                results = search_for_podcasts(brand_details)
+                results = asyncio.run(search_for_podcasts(brand_details))
                 
                 st.success(f"✅ Found {len(results)} podcast recommendations!")
                 
@@ -132,106 +225,7 @@ if submitted:
                     st.subheader("🎙️ Recommended Podcasts")
                     
                     for i, podcast in enumerate(results, 1):
-                        # Create a container for each podcast recommendation
-                        with st.container():
-                            st.markdown(f"### #{i} - {podcast['name']}")
-                            
-                            # Create columns for image and details
-                            col1, col2, col3 = st.columns([1, 2, 2])
-                            
-                            with col1:
-                                # Display podcast image
-                                if podcast['image'] and podcast['image'].strip():
-                                    try:
-                                        st.image(podcast['image'], width=150, caption=podcast['name'])
-                                    except:
-                                        st.markdown("🎙️ *No image available*")
-                                else:
-                                    st.markdown("🎙️ *No image available*")
-                            
-                            with col2:
-                                # Basic podcast info
-                                st.markdown("**📊 Match Quality**")
-                                similarity_percent = (1 - podcast['similarity_score']) * 100
-                                st.progress(similarity_percent / 100)
-                                st.write(f"Similarity Score: {similarity_percent:.1f}%")
-                                
-                                st.markdown("**📝 Description**")
-                                if podcast['summary']:
-                                    st.write(podcast['summary'][:200] + "..." if len(podcast['summary']) > 200 else podcast['summary'])
-                                else:
-                                    st.write("No description available")
-                                
-                                # Categories
-                                if podcast['categories']:
-                                    st.markdown("**🏷️ Categories**")
-                                    try:
-                                        # Parse categories if it's a JSON string
-                                        import ast
-                                        if isinstance(podcast['categories'], str) and podcast['categories'].startswith('['):
-                                            categories = ast.literal_eval(podcast['categories'])
-                                            st.write(", ".join(categories))
-                                        else:
-                                            st.write(podcast['categories'])
-                                    except:
-                                        st.write(podcast['categories'])
-                            
-                            with col3:
-                                # Advertising metrics
-                                st.markdown("**💰 Advertising Metrics**")
-                                
-                                # Format numbers nicely
-                                def format_number(num):
-                                    if num >= 1000000:
-                                        return f"{num/1000000:.1f}M"
-                                    elif num >= 1000:
-                                        return f"{num/1000:.1f}K"
-                                    else:
-                                        return str(int(num))
-                                
-                                if podcast['youtube_subscribers'] > 0:
-                                    st.metric("YouTube Subscribers", format_number(podcast['youtube_subscribers']))
-                                
-                                if podcast['instagram_followers'] > 0:
-                                    st.metric("Instagram Followers", format_number(podcast['instagram_followers']))
-                                
-                                if podcast['episode_avg_views'] > 0:
-                                    st.metric("Avg Episode Views", format_number(podcast['episode_avg_views']))
-                                
-                                # Impressions range
-                                if podcast['min_impressions'] > 0 and podcast['max_impressions'] > 0:
-                                    st.metric("Impressions Range", 
-                                             f"{format_number(podcast['min_impressions'])}-{format_number(podcast['max_impressions'])}")
-                                
-                                # Ad pricing
-                                if podcast['estimated_ad_price'] != 'N/A':
-                                    st.markdown("**💵 Estimated Ad Prices**")
-                                    st.write(f"📺 {podcast['estimated_ad_price']}")
-                            
-                            # Expandable section for more details
-                            with st.expander("📋 View Detailed Analysis & Raw Data"):
-                                st.markdown("**🔍 AI Analysis Content:**")
-                                st.text_area("Vector Search Match Content", 
-                                           podcast['content'], 
-                                           height=100, 
-                                           key=f"content_{i}")
-                                
-                                # Platform links
-                                col_yt, col_spotify = st.columns(2)
-                                with col_yt:
-                                    if podcast['youtube_id']:
-                                        st.markdown(f"🎥 [YouTube Channel](https://youtube.com/channel/{podcast['youtube_id']})")
-                                
-                                with col_spotify:
-                                    if podcast['spotify_id']:
-                                        st.markdown(f"🎵 [Spotify Podcast](https://open.spotify.com/show/{podcast['spotify_id']})")
-                                
-                                # Raw metadata
-                                if podcast['metadata']:
-                                    st.markdown("**🔧 Technical Metadata:**")
-                                    st.json(podcast['metadata'])
-                            
-                            st.markdown("---")
+                        render_podcast_card(i, podcast)
                 
                 else:
                     st.warning("No podcast recommendations found. Try adjusting your criteria.")